@@ -1,6 +1,14 @@
 """Rip your PGS subtitles."""
+import typing
 from importlib import metadata
 
+if typing.TYPE_CHECKING:
+    from . import api as pgsrip
+    from .media import Media, Pgs
+    from .mkv import Mkv
+    from .options import Options
+    from .sup import Sup
+
 __title__ = metadata.metadata(__package__)['name']
 __version__ = metadata.version(__package__)
 __short_version__ = '.'.join(__version__.split('.')[:2])
@@ -10,8 +18,29 @@ __url__ = metadata.metadata(__package__)['home_page']
 
 del metadata
 
-from . import api as pgsrip
-from .media import Media, Pgs
-from .mkv import Mkv
-from .options import Options
-from .sup import Sup
+# public name -> (module, attribute)
+LAZY_ATTRIBUTES: typing.Dict[str, typing.Tuple[str, typing.Optional[str]]] = {
+    'pgsrip': ('.api', None),
+    'Media': ('.media', 'Media'),
+    'Pgs': ('.media', 'Pgs'),
+    'Mkv': ('.mkv', 'Mkv'),
+    'Options': ('.options', 'Options'),
+    'Sup': ('.sup', 'Sup'),
+}
+
+
+def __getattr__(name: str):
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    from importlib import import_module
+
+    module_name, attribute = LAZY_ATTRIBUTES[name]
+    module = import_module(module_name, __name__)
+    value = getattr(module, attribute) if attribute else module
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_ATTRIBUTES))
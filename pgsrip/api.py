@@ -13,8 +13,18 @@ def scan_path(path: str, options: typing.Optional[Options] = None):
     collected: typing.List[Media] = []
     filtered_out: typing.List[str] = []
     discarded: typing.List[str] = []
-    core.scan_path(path, collected, filtered_out, discarded, options=options or Options())
-
+    for kind, value in core.scan_path(path, options=options or Options()):
+        if isinstance(value, Media):
+            collected.append(value)
+        elif kind == core.FILTERED_OUT:
+            filtered_out.append(value)
+        else:
+            discarded.append(value)
+
+    # directories are scanned concurrently: results are sorted to keep a stable order
+    collected.sort(key=lambda m: str(m.media_path))
+    filtered_out.sort()
+    discarded.sort()
     return collected, filtered_out, discarded
 
 
@@ -22,5 +32,9 @@ def rip(media: Media, options: typing.Optional[Options] = None):
     return core.rip(media, options or Options())
 
 
+def rip_pgs_medias(pgs_medias: typing.List[Pgs], options: typing.Optional[Options] = None):
+    return core.rip_pgs_medias(pgs_medias, options or Options())
+
+
 def rip_pgs(pgs: Pgs, options: typing.Optional[Options] = None):
     return core.rip_pgs(pgs, options or Options())
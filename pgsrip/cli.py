@@ -1,7 +1,11 @@
 import logging
+import multiprocessing
 import os
 import re
+import sys
 import typing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
 from datetime import timedelta
 from types import TracebackType
 
@@ -62,11 +66,14 @@ class LanguageParamType(click.ParamType):
             self.fail(f"{click.style(f'{value}', bold=True)} is not a valid language")
 
 
+AGE_PATTERN = re.compile(r'^(?:(?P<weeks>\d+?)w)?(?:(?P<days>\d+?)d)?(?:(?P<hours>\d+?)h)?$')
+
+
 class AgeParamType(click.ParamType):
     name = 'age'
 
     def convert(self, value, param, ctx):
-        match = re.match(r'^(?:(?P<weeks>\d+?)w)?(?:(?P<days>\d+?)d)?(?:(?P<hours>\d+?)h)?$', value)
+        match = AGE_PATTERN.match(value)
         if not match:
             self.fail('%s is not a valid age' % value)
 
@@ -77,6 +84,20 @@ LANGUAGE = LanguageParamType()
 AGE = AgeParamType()
 
 
+WORKER_OPTIONS: typing.Optional[Options] = None
+
+
+def init_rip_worker(options: Options):
+    global WORKER_OPTIONS
+    WORKER_OPTIONS = options
+    # the pool already uses every core: one thread per tesseract, unless set by the user
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+def rip_worker_pgs_medias(pgs_medias: typing.List[Pgs]):
+    return api.rip_pgs_medias(pgs_medias, typing.cast(Options, WORKER_OPTIONS))
+
+
 @click.command()
 @click.option('-c', '--config', type=click.Path(), help='cleanit configuration path to be used')
 @click.option('-l', '--language', type=LANGUAGE, multiple=True, help='Language as IETF code, '
@@ -90,7 +111,9 @@ AGE = AgeParamType()
               help='re-rip and overwrite existing srt subtitles, even if they already exist')
 @click.option('-a', '--all', is_flag=True, default=False,
               help='rip all tracks for a given language, even another track for that language was already ripped')
-@click.option('-w', '--max-workers', type=click.IntRange(1, 50), default=None, help='Maximum number of threads to use.')
+@click.option('-w', '--max-workers', type=click.IntRange(1, 50), default=None, help='Maximum number of workers to use.')
+@click.option('--tesseract-cli', is_flag=True, default=False,
+              help='Run the tesseract command, even when tesserocr is installed.')
 @click.option('--keep-temp-files', is_flag=True, help='Do not delete temporary files created, '
                                                       'e.g. extracted sup files, generated png files '
                                                       'and other useful debug files')
@@ -108,6 +131,7 @@ def pgsrip(config: typing.Optional[str],
            all: bool,
            debug: bool,
            max_workers: typing.Optional[int],
+           tesseract_cli: bool,
            keep_temp_files: bool,
            verbose: int,
            path: typing.Tuple[str]):
@@ -116,20 +140,21 @@ def pgsrip(config: typing.Optional[str],
         handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
         logger.addHandler(handler)
         logger.setLevel(logging.DEBUG)
-        logger.info(f'Tesseract version: {tess.get_tesseract_version()}')
-        logger.info(f'Tesseract data: {os.getenv("TESSDATA_PREFIX")}')
+        logger.info('Tesseract version: %s', tess.get_tesseract_version())
+        logger.info('Tesseract data: %s', os.getenv('TESSDATA_PREFIX'))
 
     if config and (not os.path.isfile(config) or os.path.isdir(config)):
         click.echo(f"Invalid configuration is defined: {click.style(config, bold=True)}")
         return
 
     options = Options(config_path=config,
-                      languages=set(language or []),
-                      tags=set(tag or []),
+                      languages=frozenset(language or ()),
+                      tags=frozenset(tag or ()),
                       encoding=encoding,
                       overwrite=force,
                       one_per_lang=not all,
                       keep_temp_files=keep_temp_files,
+                      tesseract_cli=tesseract_cli,
                       max_workers=max_workers,
                       age=age,
                       srt_age=srt_age)
@@ -150,13 +175,14 @@ def pgsrip(config: typing.Optional[str],
         discarded_paths.extend(d)
 
     if debug or verbose > 1:
+        lines: typing.List[str] = []
         if verbose > 2:
-            for p in filtered_out_paths:
-                click.echo(f"{click.style(p, fg='yellow', bold=True)} filtered out")
-        for p in discarded_paths:
-            click.echo(f"{click.style(p, fg='red', bold=True)} discarded")
+            lines.extend(f"{click.style(p, fg='yellow', bold=True)} filtered out" for p in filtered_out_paths)
+        lines.extend(f"{click.style(p, fg='red', bold=True)} discarded" for p in discarded_paths)
+        if lines:
+            click.echo('\n'.join(lines))
 
-    collected_pgs_medias: typing.List[Pgs] = []
+    collected_pgs_groups: typing.List[typing.List[Pgs]] = []
     medias_progressbar = DebugProgressBar(debug or verbose > 1,
                                           collected_medias,
                                           label='Collecting pgs subtitles',
@@ -164,7 +190,8 @@ def pgsrip(config: typing.Optional[str],
 
     with medias_progressbar as bar:
         for m in bar:
-            collected_pgs_medias.extend(list(m.get_pgs_medias(options)))
+            collected_pgs_groups.append(list(m.get_pgs_medias(options)))
+    collected_pgs_medias = [pgs for pgs_medias in collected_pgs_groups for pgs in pgs_medias]
 
     # report collected medias
     report = (f"{click.style(str(len(collected_pgs_medias)), bold=True, fg='green')} "
@@ -187,9 +214,24 @@ def pgsrip(config: typing.Optional[str],
 
     ripped_count = 0
     with pgs_progressbar as bar:
-        for pgs in bar:
-            bar.update(0, pgs)
-            ripped_count += api.rip_pgs(pgs, options)
+        if debug or max_workers == 1:
+            for pgs_medias in collected_pgs_groups:
+                if pgs_medias:
+                    bar.update(0, pgs_medias[0])
+                    ripped_count += api.rip_pgs_medias(pgs_medias, options)
+                    bar.update(len(pgs_medias), pgs_medias[-1])
+        else:
+            mp_context = multiprocessing.get_context('fork') if sys.platform.startswith('linux') else None
+            # with fewer workers than cores, each worker splits its images between the idle cores
+            shards = max(1, (os.cpu_count() or 1) // max_workers) if max_workers else 1
+            worker_options = replace(options, tesseract_shards=shards)
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                     initializer=init_rip_worker, initargs=(worker_options,)) as executor:
+                futures = {executor.submit(rip_worker_pgs_medias, pgs_medias): pgs_medias
+                           for pgs_medias in collected_pgs_groups if pgs_medias}
+                for future in as_completed(futures):
+                    ripped_count += int(future.result())
+                    bar.update(len(futures[future]), futures[future][-1])
 
     # report ripped subtitles
     click.echo(f"{click.style(str(ripped_count), bold=True, fg='green')} "
@@ -1,6 +1,7 @@
 import logging
 import os
 import typing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from pgsrip.media import Media, Pgs
 from pgsrip.mkv import Mkv
@@ -18,41 +19,101 @@ MEDIAS: typing.Dict[str, typing.Union[typing.Type[Sup], typing.Type[Mkv]]] = {
 }
 EXTENSIONS = tuple(MEDIAS.keys())
 
+COLLECTED = 'collected'
+FILTERED_OUT = 'filtered_out'
+DISCARDED = 'discarded'
 
-def scan_path(path: str,
-              collected: typing.List[Media],
-              filtered_out: typing.List[str],
-              discarded: typing.List[str],
-              options: Options):
+ScanResult = typing.Tuple[str, typing.Union[Media, str]]
+
+
+def scan_path(path: str, options: Options) -> typing.Iterator[ScanResult]:
     if not os.path.exists(path):
         logger.debug('Non existent path %s discarded', path)
-        discarded.append(path)
+        yield DISCARDED, path
 
     elif os.path.isfile(path):
-        if path.lower().endswith(EXTENSIONS):
-            if path.lower().endswith(EXTENSIONS):
-                # noinspection PyBroadException
-                try:
-                    ext = os.path.splitext(path.lower())[1]
-                    media = MEDIAS[ext](path)
-                    if media.matches(options):
-                        collected.append(media)
-                    else:
-                        filtered_out.append(path)
-                except Exception as exc:
-                    logger.debug('Path %s discarded: <%s> %s', path, type(exc).__name__, exc)
-                    discarded.append(path)
+        yield from scan_file(path, options)
 
     elif os.path.isdir(path):
-        for dir_path, dir_names, file_names in os.walk(path):
-            for filename in file_names:
-                file_path = os.path.join(dir_path, filename)
-                scan_path(file_path, collected, filtered_out, discarded, options)
+        yield from scan_dir(path, options)
+
+
+def scan_file(path: str, options: Options) -> typing.Iterator[ScanResult]:
+    lower_path = path.lower()
+    dot = lower_path.rfind('.')
+    media_class = MEDIAS.get(lower_path[dot:]) if dot >= 0 else None
+    if media_class is None:
+        return
+
+    result: ScanResult
+    # noinspection PyBroadException
+    try:
+        media = media_class(path)
+        result = (COLLECTED, media) if media.matches(options) else (FILTERED_OUT, path)
+    except Exception as exc:
+        logger.debug('Path %s discarded: <%s> %s', path, type(exc).__name__, exc)
+        result = (DISCARDED, path)
+
+    yield result
+
+
+def scan_dir(path: str, options: Options) -> typing.Iterator[ScanResult]:
+
+    def scan_entries(dir_path: str):
+        dir_paths: typing.List[str] = []
+        file_paths: typing.List[str] = []
+        results: typing.List[ScanResult] = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        # symlinked directories are not followed, as in os.walk
+                        if not entry.is_symlink():
+                            dir_paths.append(entry.path)
+                    elif not entry.is_file():
+                        # e.g. broken symbolic links, which are reported as discarded
+                        results.extend(scan_path(entry.path, options))
+                    elif entry.name.lower().endswith(EXTENSIONS):
+                        file_paths.append(entry.path)
+        except OSError as exc:
+            logger.debug('Directory %s ignored: <%s> %s', dir_path, type(exc).__name__, exc)
+
+        return dir_paths, file_paths, results
+
+    def scan_entry_file(file_path: str):
+        return list(scan_file(file_path, options))
+
+    with ThreadPoolExecutor(max_workers=options.max_workers or 8) as executor:
+        dir_futures = {executor.submit(scan_entries, path)}
+        pending = set(dir_futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in dir_futures:
+                    dir_futures.remove(future)
+                    dir_paths, file_paths, results = future.result()
+                    for p in dir_paths:
+                        dir_future = executor.submit(scan_entries, p)
+                        dir_futures.add(dir_future)
+                        pending.add(dir_future)
+                    pending.update(executor.submit(scan_entry_file, p) for p in file_paths)
+                else:
+                    results = future.result()
+
+                yield from results
 
 
 def rip(media: Media, options: Options):
+    return rip_pgs_medias(list(media.get_pgs_medias(options)), options)
+
+
+def rip_pgs_medias(pgs_medias: typing.List[Pgs], options: Options):
+    if not pgs_medias:
+        return 0
+
+    type(pgs_medias[0]).prepare_data(pgs_medias)
     counter = 0
-    for pgs in media.get_pgs_medias(options):
+    for pgs in pgs_medias:
         counter += rip_pgs(pgs, options)
 
     return counter
@@ -68,6 +129,7 @@ def rip_pgs(pgs: Pgs, options: Options):
             rules = options.config.select_rules(tags=options.tags, languages={p.language})
             srt = PgsToSrtRipper(p, options).rip(lambda t: rules.apply(t, '')[0])
             srt.save(encoding=options.encoding)
+            p.srt_path.clear_stat()
             return True
     except Exception as e:
         logger.warning('Error while trying to rip %s: <%s> [%s]',
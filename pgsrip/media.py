@@ -11,15 +11,19 @@ from types import TracebackType
 
 from babelfish import Language
 
+import numpy as np
+
 from pgsrip.media_path import MediaPath
 from pgsrip.options import Options
-from pgsrip.pgs import DisplaySet, Palette, PgsImage, PgsReader
-from pgsrip.utils import pairwise
+from pgsrip.pgs import DisplaySet, PgsImage, PgsReader
+from pgsrip.utils import to_time
 
 logger = logging.getLogger(__name__)
 
 
 class PgsSubtitleItem:
+    __slots__ = ('index', 'media_path', 'start', 'end', 'image', 'x_offset', 'y_offset', 'text', 'place',
+                 '_shape', '_h_center')
 
     def __init__(self,
                  index: int,
@@ -27,51 +31,85 @@ class PgsSubtitleItem:
                  display_sets: typing.List[DisplaySet]):
         self.index = index
         self.media_path = media_path
-        self.start = min([ds.pcs.presentation_timestamp for ds in display_sets] or [None])
-        self.end = max([ds.pcs.presentation_timestamp for ds in display_sets] or [None])
+        # display_sets is never empty: create_items always groups at least one display set per item
+        first = display_sets[0]
+        start = end = first.pcs.presentation_ordinal
+        x_offset, y_offset = first.wds.x_offset, first.wds.y_offset
+        for ds in display_sets[1:]:
+            timestamp = ds.pcs.presentation_ordinal
+            wds = ds.wds
+            start = min(start, timestamp)
+            end = max(end, timestamp)
+            x_offset = min(x_offset, wds.x_offset)
+            y_offset = min(y_offset, wds.y_offset)
+        # timestamps are kept as milliseconds and only converted to SubRipTime when writing the srt
+        self.start = start
+        self.end = end
+        self.x_offset = x_offset
+        self.y_offset = y_offset
         self.image = PgsSubtitleItem.generate_image(display_sets)
-        self.x_offset = min([ds.wds.x_offset for ds in display_sets] or [None])
-        self.y_offset = min([ds.wds.y_offset for ds in display_sets] or [None])
         self.text: typing.Optional[str] = None
         self.place: typing.Optional[typing.Tuple[int, int, int, int]] = None
+        self._shape: typing.Optional[typing.Tuple[int, int, int, int]] = None
+        self._h_center = 0
 
     @staticmethod
     def create_items(media_path: MediaPath, display_sets: typing.Iterable[DisplaySet]):
         current_sets: typing.List[DisplaySet] = []
         index = 0
         candidates: typing.List[PgsSubtitleItem] = []
+        valid_candidates: typing.List[bool] = []
         for ds in display_sets:
             if current_sets and ds.is_start():
-                candidates.append(PgsSubtitleItem(index, media_path, current_sets))
+                item = PgsSubtitleItem(index, media_path, current_sets)
+                candidates.append(item)
+                valid_candidates.append(item.validate())
                 current_sets = []
                 index += 1
 
             current_sets.append(ds)
 
         if current_sets:
-            candidates.append(PgsSubtitleItem(index, media_path, current_sets))
+            item = PgsSubtitleItem(index, media_path, current_sets)
+            candidates.append(item)
+            valid_candidates.append(item.validate())
+
+        valid_ends = PgsSubtitleItem.fix_end_timestamps(candidates)
 
-        results = []
-        for item, next_item in pairwise(candidates):
-            if item.auto_fix(next_item=next_item):
-                results.append(item)
+        return [item for item, valid, valid_end in zip(candidates, valid_candidates, valid_ends) if valid and valid_end]
 
-        return results
+    @staticmethod
+    def fix_end_timestamps(items: typing.List[PgsSubtitleItem]):
+        count = len(items)
+        starts = np.fromiter((item.start for item in items), dtype=np.int64, count=count)
+        ends = np.fromiter((item.end or 0 for item in items), dtype=np.int64, count=count)
+        next_starts = np.append(starts[1:], 0)
+        missing = ends <= starts
+        fixable = missing & (next_starts > 0) & (starts + 10000 >= next_starts)
+        corrupted = missing & ~fixable
+        fixed_ends = np.maximum(starts + 1, next_starts - 1)
+
+        for i in np.flatnonzero(fixable):
+            items[i].end = int(fixed_ends[i])
+            logger.info('Fix applied for %r: Subtitle end timestamp was fixed', items[i])
+        for i in np.flatnonzero(corrupted):
+            logger.warning('Corrupted %r: Subtitle with corrupted end timestamp', items[i])
+
+        return ~corrupted
 
     @staticmethod
     def generate_image(display_sets: typing.Iterable[DisplaySet]):
-        for ds in display_sets:
-            if not ds.pcs.is_start():
-                continue
+        start_ds = next((ds for ds in display_sets if ds.pcs.is_start()), None)
+        if start_ds is None:
+            return None
 
-            palettes: typing.List[Palette] = []
-            for pds in ds.pds_segments:
-                palettes += pds.palettes
-            img_data = b''
-            for ods in ds.ods_segments:
-                img_data += ods.img_data
+        pds_segments = start_ds.pds_segments
+        palette_lut = (np.concatenate([pds.palette_lut for pds in pds_segments]) if pds_segments
+                       else np.zeros((0, 4), dtype=np.uint8))
+        ods_segments = start_ds.ods_segments
+        width = ods_segments[0].width if ods_segments else None
 
-            return PgsImage(img_data, palettes)
+        return PgsImage(start_ds.rle_data, palette_lut, width)
 
     @property
     def language(self):
@@ -87,17 +125,23 @@ class PgsSubtitleItem:
 
     @property
     def h_center(self):
-        shape = self.shape
-        return shape[0] + (shape[2] - shape[0]) // 2
+        if self._shape is None:
+            self.compute_shape()
+        return self._h_center
 
     @property
     def shape(self):
+        if self._shape is None:
+            self.compute_shape()
+        return self._shape
+
+    def compute_shape(self):
         height, width = self.height, self.width
         y_offset, x_offset = self.y_offset, self.x_offset
+        self._shape = y_offset, x_offset, y_offset + height, x_offset + width
+        self._h_center = y_offset + height // 2
 
-        return y_offset, x_offset, y_offset + height, x_offset + width
-
-    def auto_fix(self, next_item: typing.Optional[PgsSubtitleItem]):
+    def validate(self):
         valid = True
         if self.image is None:
             logger.warning('Corrupted %r: No Image', self)
@@ -108,16 +152,6 @@ class PgsSubtitleItem:
         if self.x_offset is None:
             logger.warning('Corrupted %r: No x_offset', self)
             valid = False
-        if self.start is None:
-            logger.warning('Corrupted %r: No Start timestamp', self)
-            valid = False
-        elif not self.end or self.end <= self.start:
-            if next_item and next_item.start and self.start + 10000 >= next_item.start:
-                self.end = max(self.start + 1, next_item.start - 1)
-                logger.info('Fix applied for %r: Subtitle end timestamp was fixed', self)
-            else:
-                logger.warning('Corrupted %r: Subtitle with corrupted end timestamp', self)
-                valid = False
 
         return valid
 
@@ -130,55 +164,74 @@ class PgsSubtitleItem:
         return f'<{self.__class__.__name__} [{self}]>'
 
     def __str__(self):
-        return f'{self.media_path} [{self.start} --> {self.end or ""}]'
+        return f'{self.media_path} [{to_time(self.start)} --> {to_time(self.end) or ""}]'
 
 
 class Pgs:
+    __slots__ = ('media_path', 'options', 'data_reader', '_temp_folder', '_items', '_srt_path')
 
     def __init__(self,
                  media_path: MediaPath,
                  options: Options,
-                 data_reader: typing.Callable[[], bytes],
-                 temp_folder: str):
+                 data_reader: typing.Callable[[], typing.BinaryIO],
+                 temp_folder: typing.Optional[str] = None):
         self.media_path = media_path
         self.options = options
         self.data_reader = data_reader
-        self.temp_folder = temp_folder
+        self._temp_folder = temp_folder
         self._items: typing.Optional[typing.List[PgsSubtitleItem]] = None
+        self._srt_path: typing.Optional[MediaPath] = None
 
     @property
     def language(self):
         return self.media_path.language
 
+    @property
+    def temp_folder(self):
+        if self._temp_folder is None:
+            self._temp_folder = self.create_temp_folder()
+        return self._temp_folder
+
+    def create_temp_folder(self):
+        return self.media_path.create_temp_folder()
+
+    @classmethod
+    def prepare_data(cls, pgs_medias: typing.List[Pgs]):
+        pass
+
     @property
     def srt_path(self):
-        return self.media_path.translate(number=0, extension='srt')
+        if self._srt_path is None:
+            self._srt_path = self.media_path.translate(number=0, extension='srt')
+        return self._srt_path
 
     @property
     def items(self):
         if self._items is None:
-            data = self.data_reader()
-            self._items = self.decode(data, self.media_path)
+            with self.data_reader() as data:
+                self._items = self.decode(data, self.media_path)
         return self._items
 
     def matches(self, options: Options):
-        if not self.srt_path.exists():
+        srt_stat = self.srt_path.stat_or_none()
+        if srt_stat is None:
             return True
 
         if not options.overwrite:
             logger.debug('Skipping %s since %s already exists', self, self.srt_path)
             return False
-        if options.srt_age and self.srt_path.m_age < options.srt_age:
+        if options.srt_age and MediaPath.get_age(srt_stat) < options.srt_age:
             logger.debug('Skipping since %s is too new', self.srt_path)
             return False
 
         return True
 
-    def decode(self, data: bytes, media_path: MediaPath):
-        display_sets = list(PgsReader.decode(data, media_path))
-        logger.info(f'Decoding {media_path}')
+    def decode(self, data: typing.BinaryIO, media_path: MediaPath):
+        logger.info('Decoding %s', media_path)
+        display_sets: typing.Iterable[DisplaySet] = PgsReader.decode(data, media_path)
 
         if self.options.keep_temp_files:
+            display_sets = list(display_sets)
             self.dump_display_sets(display_sets)
 
         return PgsSubtitleItem.create_items(media_path, display_sets)
@@ -205,14 +258,20 @@ class Pgs:
                  exc: typing.Optional[BaseException],
                  traceback: typing.Optional[TracebackType]):
         self._items = None
+        temp_folder = self._temp_folder
+        if temp_folder is None:
+            return
+
         if self.options.keep_temp_files:
-            logger.info('Keeping temporary files in %s', self.temp_folder)
+            logger.info('Keeping temporary files in %s', temp_folder)
         else:
-            logger.debug('Removing temporary files in %s', self.temp_folder)
-            shutil.rmtree(self.temp_folder)
+            logger.debug('Removing temporary files in %s', temp_folder)
+            shutil.rmtree(temp_folder)
+            self._temp_folder = None
 
 
 class Media(ABC):
+    __slots__ = ('name', 'media_path', 'languages')
 
     def __init__(self, media_path: MediaPath, languages: typing.Set[Language]):
         self.name = str(media_path)
@@ -227,16 +286,17 @@ class Media(ABC):
 
     @property
     def age(self):
-        if self.media_path.exists():
-            return self.media_path.m_age
+        stat_result = self.media_path.stat_or_none()
+        if stat_result is not None:
+            return MediaPath.get_age(stat_result)
 
         return timedelta()
 
     def matches(self, options: Options):
-        if options.age and self.age > options.age:
+        if options.languages and not self.languages.intersection(options.languages):
             return False
 
-        if options.languages and not self.languages.intersection(options.languages):
+        if options.age and self.age > options.age:
             return False
 
         return True
@@ -1,61 +1,121 @@
 import logging
 import os
 import tempfile
+import time
 import typing
-from copy import copy
-from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache
 
 from babelfish import Language
 
+import cleanit  # noqa: F401 registers the cleanit language converter
+
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def parse_language(code: str) -> Language:
+    return Language.fromcleanit(code)
+
+
 class MediaPath:
+    __slots__ = ('_number', '_language', '_extension', '_base_path', '_stat', '_str', '_repr')
 
     def __init__(self, path: str):
-        file_part, extension = os.path.splitext(path)
-        base_path, code = os.path.splitext(file_part)
-        self.number = 0
-        self.language = Language.fromcleanit(code[1:] if code else 'und')
-        self.extension = extension[1:] if extension else None
-        self.base_path = base_path if self.language else file_part
+        # same split as applying os.path.splitext twice
+        name_start = max(path.rfind(os.sep), path.rfind(os.altsep) if os.altsep else -1) + 1
+        while name_start < len(path) and path[name_start] == '.':
+            name_start += 1
+        extension_dot = path.rfind('.', name_start)
+        file_part_end = extension_dot if extension_dot >= 0 else len(path)
+        code_dot = path.rfind('.', name_start, file_part_end)
+        self._number = 0
+        self._language = parse_language(path[code_dot + 1:file_part_end] if code_dot >= 0 else 'und')
+        self._extension = path[extension_dot + 1:] if extension_dot >= 0 else None
+        self._base_path = path[:code_dot] if code_dot >= 0 and self._language else path[:file_part_end]
+        self._stat: typing.Optional[os.stat_result] = None
+        self._str: typing.Optional[str] = None
+        self._repr: typing.Optional[str] = None
+
+    @property
+    def number(self) -> int:
+        return self._number
+
+    @property
+    def language(self) -> Language:
+        return self._language
+
+    @property
+    def extension(self) -> typing.Optional[str]:
+        return self._extension
+
+    @property
+    def base_path(self) -> str:
+        return self._base_path
 
     def __repr__(self):
-        return f'<{self.__class__.__name__} [{str(self)}]>'
+        if self._repr is None:
+            self._repr = f'<{self.__class__.__name__} [{str(self)}]>'
+        return self._repr
 
     def __str__(self):
-        return f'{self.base_path}' \
-               f'{f"-{self.number}" if self.number else ""}' \
-               f'{f".{str(self.language)}" if self.language else ""}' \
-               f'{f".{self.extension}" if self.extension else ""}'
+        # the properties are read-only: translate builds a new instance
+        if self._str is None:
+            self._str = f'{self.base_path}' \
+                        f'{f"-{self.number}" if self.number else ""}' \
+                        f'{f".{str(self.language)}" if self.language else ""}' \
+                        f'{f".{self.extension}" if self.extension else ""}'
+        return self._str
+
+    def __fspath__(self) -> str:
+        return str(self)
 
     @property
     def m_age(self):
-        return datetime.utcnow() - datetime.utcfromtimestamp(os.path.getmtime(str(self)))
+        return self.get_age(self.stat())
+
+    @classmethod
+    def get_age(cls, stat_result: os.stat_result):
+        return timedelta(seconds=time.time() - stat_result.st_mtime)
+
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            self._stat = os.stat(self)
+        return self._stat
+
+    def stat_or_none(self) -> typing.Optional[os.stat_result]:
+        try:
+            return self.stat()
+        except OSError:
+            return None
+
+    def clear_stat(self):
+        self._stat = None
 
     def create_temp_folder(self):
-        base_name = os.path.basename(str(self))
+        base_name = os.path.basename(self)
         temp_folder = tempfile.mkdtemp(prefix=base_name, suffix='.pgsrip')
         logger.debug('%s is using temporary folder %s', self, temp_folder)
         return temp_folder
 
-    def get_data(self):
-        with open(str(self), 'rb') as f:
-            return f.read()
+    def open_data(self) -> typing.BinaryIO:
+        return open(self, 'rb')
 
     def exists(self):
-        return os.path.exists(str(self))
+        return self.stat_or_none() is not None
 
     def translate(self,
                   language: typing.Optional[Language] = None,
                   extension: typing.Optional[str] = None,
                   number: typing.Optional[int] = None):
-        media_path = copy(self)
-        if number is not None:
-            media_path.number = number
-        if language is not None:
-            media_path.language = language
-        if extension is not None:
-            media_path.extension = extension
+        cls = self.__class__
+        media_path = cls.__new__(cls)
+        media_path._number = number if number is not None else self._number
+        media_path._language = language if language is not None else self._language
+        media_path._extension = extension if extension is not None else self._extension
+        media_path._base_path = self._base_path
+        media_path._stat = None
+        media_path._str = None
+        media_path._repr = None
         return media_path
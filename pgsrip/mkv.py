@@ -1,72 +1,144 @@
-import json
+import hashlib
 import logging
 import os
+import time
 import typing
-from subprocess import check_output
+from collections import Counter
+from datetime import timedelta
+from functools import lru_cache
+from operator import attrgetter
+from subprocess import CalledProcessError, check_output
 
 from babelfish import Language
 
 from trakit.api import trakit
 
 from pgsrip.media import Media, Pgs
-from pgsrip.media_path import MediaPath
+from pgsrip.media_path import MediaPath, parse_language
 from pgsrip.options import Options
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
+# an empty PGSRIP_MKVMERGE_CACHE_DIR disables the cache
+MKVMERGE_CACHE_DIR = os.getenv('PGSRIP_MKVMERGE_CACHE_DIR', os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')), 'pgsrip', 'mkvmerge'))
+MKVMERGE_CACHE_MAX_AGE = timedelta(days=30)
+MKVMERGE_CACHE_PRUNED = False
+
+
+@lru_cache(maxsize=4096)
+def guess_language(lang_ietf: typing.Optional[str],
+                   lang_alpha: typing.Optional[str],
+                   track_name: typing.Optional[str]) -> Language:
+    language = parse_language(lang_ietf or lang_alpha or 'und')
+    options = {'expected_language': language} if language else {}
+    guess = trakit(track_name, options) if track_name else {}
+
+    return guess.get('language') or language
+
+
+def prune_mkvmerge_cache():
+    global MKVMERGE_CACHE_PRUNED
+    if MKVMERGE_CACHE_PRUNED:
+        return
+
+    MKVMERGE_CACHE_PRUNED = True
+    expiration = time.time() - MKVMERGE_CACHE_MAX_AGE.total_seconds()
+    try:
+        entries = list(os.scandir(MKVMERGE_CACHE_DIR))
+    except OSError as exc:
+        logger.debug('Unable to prune mkvmerge cache %s: <%s> %s', MKVMERGE_CACHE_DIR, type(exc).__name__, exc)
+        return
+
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < expiration:
+                logger.debug('Removing expired mkvmerge cache file %s', entry.path)
+                os.remove(entry.path)
+        except OSError as exc:
+            logger.debug('Unable to remove mkvmerge cache file %s: <%s> %s', entry.path, type(exc).__name__, exc)
+
 
 class MkvPgs(Pgs):
+    __slots__ = ('mkv_path', 'track_id')
 
     @classmethod
-    def read_data(cls, media_path: MediaPath, track_id: int, temp_folder: str):
+    def get_sup_file(cls, media_path: MediaPath, track_id: int, temp_folder: str):
         lang_ext = f'.{str(media_path.language)}' if media_path.language else ''
-        sup_file = os.path.join(temp_folder, f'{track_id}{lang_ext}.sup')
-        cmd = ['mkvextract', str(media_path), 'tracks', f'{track_id}:{sup_file}']
+        return os.path.join(temp_folder, f'{track_id}{lang_ext}.sup')
+
+    @classmethod
+    def extract(cls, media_path: MediaPath, sup_files: typing.Dict[int, str]):
+        cmd = ['mkvextract', str(media_path), 'tracks'] + [
+            f'{track_id}:{sup_file}' for track_id, sup_file in sup_files.items()]
         check_output(cmd)
-        with open(sup_file, mode='rb') as f:
-            return f.read()
+
+    @classmethod
+    def prepare_data(cls, pgs_medias: typing.List[Pgs]):
+        mkv_pgs_medias = [p for p in pgs_medias if isinstance(p, MkvPgs)]
+        if len(mkv_pgs_medias) < 2:
+            return
+
+        mkv_path = mkv_pgs_medias[0].mkv_path
+        try:
+            cls.extract(mkv_path, {p.track_id: p.sup_file for p in mkv_pgs_medias})
+        except (CalledProcessError, OSError) as exc:
+            logger.debug('Unable to extract tracks from %s in a single pass: <%s> %s',
+                         mkv_path, type(exc).__name__, exc)
+            # tracks are then extracted one by one when their data is read
+            for p in mkv_pgs_medias:
+                if os.path.exists(p.sup_file):
+                    os.remove(p.sup_file)
+
+    @classmethod
+    def read_data(cls, media_path: MediaPath, track_id: int, temp_folder: str) -> typing.BinaryIO:
+        sup_file = cls.get_sup_file(media_path, track_id, temp_folder)
+        if not os.path.exists(sup_file):
+            cls.extract(media_path, {track_id: sup_file})
+        return open(sup_file, mode='rb')
 
     def __init__(self, media_path: MediaPath, track_id: int, language: Language, number: int, options: Options):
-        temp_folder = media_path.create_temp_folder()
         super().__init__(media_path=media_path.translate(language=language, number=number),
                          options=options,
-                         data_reader=lambda: self.read_data(
-                             media_path=media_path, track_id=track_id, temp_folder=temp_folder),
-                         temp_folder=temp_folder)
+                         data_reader=self.read_track_data)
+        self.mkv_path = media_path
         self.track_id = track_id
 
+    @property
+    def sup_file(self):
+        return self.get_sup_file(self.mkv_path, self.track_id, self.temp_folder)
+
+    def read_track_data(self):
+        return self.read_data(self.mkv_path, self.track_id, self.temp_folder)
+
+    def create_temp_folder(self):
+        return self.mkv_path.create_temp_folder()
+
     def __str__(self):
         return (f'{self.media_path.translate(language=Language("und"), number=0)} '
                 f'[{self.track_id}:{self.media_path.language}]')
 
 
 class MkvTrack:
+    __slots__ = ('id', 'type', 'codec', 'properties', 'enabled', 'forced', 'language')
 
     def __init__(self, track: dict):
+        properties = track.get('properties', {})
         self.id = track['id']
         self.type = track['type']
         self.codec = track['codec']
-        self.properties = track.get('properties', {})
-
-    @property
-    def enabled(self):
-        return self.properties.get('enabled_track')
-
-    @property
-    def language(self):
-        lang_ietf = self.properties.get('language_ietf')
-        lang_alpha = self.properties.get('language')
-        track_name = self.properties.get('track_name')
-
-        language = Language.fromcleanit(lang_ietf or lang_alpha or 'und')
-        options = {'expected_language': language} if language else {}
-        guess = trakit(track_name, options) if track_name else {}
-
-        return guess.get('language') or language
-
-    @property
-    def forced(self):
-        return self.properties.get('forced_track')
+        self.properties = properties
+        self.enabled = properties.get('enabled_track')
+        self.forced = properties.get('forced_track')
+        self.language: typing.Optional[Language] = guess_language(
+            properties.get('language_ietf'),
+            properties.get('language'),
+            properties.get('track_name')) if self.type == 'subtitles' else None
 
     def __repr__(self):
         return f'<{self.__class__.__name__} [{str(self)}]>'
@@ -76,21 +148,54 @@ class MkvTrack:
 
 
 class Mkv(Media):
+    __slots__ = ('tracks',)
 
     def __init__(self, path: str):
-        metadata = json.loads(check_output(['mkvmerge', '-i', '-F', 'json', path]))
+        metadata = json_loads(self.identify(path))
         tracks = [MkvTrack(t) for t in metadata.get('tracks', [])]
-        super().__init__(MediaPath(path), languages={t.language for t in tracks})
+        super().__init__(MediaPath(path), languages={t.language for t in tracks if t.language is not None})
         self.tracks = tracks
 
+    @classmethod
+    def identify(cls, path: str) -> bytes:
+        cmd = ['mkvmerge', '-i', '-F', 'json', path]
+        if not MKVMERGE_CACHE_DIR:
+            return check_output(cmd)
+
+        stat_result = os.stat(path)
+        key = f'{os.path.abspath(path)}:{stat_result.st_mtime_ns}:{stat_result.st_size}'
+        cache_file = os.path.join(MKVMERGE_CACHE_DIR, f'{hashlib.sha1(key.encode("utf8")).hexdigest()}.json')
+        try:
+            with open(cache_file, mode='rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        output = check_output(cmd)
+        try:
+            os.makedirs(MKVMERGE_CACHE_DIR, exist_ok=True)
+            temp_file = f'{cache_file}.{os.getpid()}.tmp'
+            with open(temp_file, mode='wb') as f:
+                f.write(output)
+            os.replace(temp_file, cache_file)
+        except OSError as exc:
+            logger.debug('Unable to cache mkvmerge output for %s: <%s> %s', path, type(exc).__name__, exc)
+
+        prune_mkvmerge_cache()
+        return output
+
     def get_pgs_medias(self, options: Options):
         tracks = [t for t in self.tracks
                   if t.type == 'subtitles' and t.codec == 'HDMV PGS' and t.enabled]
-        tracks.sort(key=lambda x: x.forced)
-        tracks.sort(key=lambda x: x.id)
-        selected_languages: typing.Dict[Language, int] = {}
+        tracks.sort(key=attrgetter('id'))
+        # a Counter does not insert missing languages when reading them, unlike a defaultdict
+        selected_languages: typing.Counter[Language] = Counter()
         for t in tracks:
             language = t.language
+            if not language:
+                logger.debug('Skipping unknown language track %s in %s', t.id, self)
+                continue
+
             if options.languages and language not in options.languages:
                 logger.debug('Filtering out track %s:%s in %s', t.id, language, self)
                 continue
@@ -99,12 +204,9 @@ class Mkv(Media):
                 logger.debug('Skipping track %s:%s in %s', t.id, language, self)
                 continue
 
-            if not language:
-                logger.debug('Skipping unknown language track %s in %s', t.id, self)
-                continue
-
-            pgs = MkvPgs(self.media_path, t.id, language, selected_languages.get(language, 0), options=options)
+            number = selected_languages[language]
+            pgs = MkvPgs(self.media_path, t.id, language, number, options=options)
             if pgs.matches(options):
                 logger.debug('Selecting track %s:%s in %s', t.id, language, self)
+                selected_languages[language] += 1
                 yield pgs
-                selected_languages[language] = selected_languages.get(language, 0) + 1
@@ -1,6 +1,8 @@
 import enum
 import typing
+from dataclasses import dataclass, field
 from datetime import timedelta
+from functools import lru_cache
 
 from babelfish import Language
 
@@ -33,37 +35,35 @@ class TesseractPageSegmentationMode(enum.Enum):
     RAW_LINE = 13
 
 
+@lru_cache(maxsize=32)
+def load_config(config_path: typing.Optional[str] = None) -> Config:
+    return Config.from_path(config_path) if config_path else Config()
+
+
+@dataclass(frozen=True, repr=False)
 class Options:
+    config_path: typing.Optional[str] = None
+    languages: typing.AbstractSet[Language] = frozenset()
+    tags: typing.AbstractSet[str] = frozenset(('default',))
+    encoding: typing.Optional[str] = None
+    overwrite: bool = False
+    one_per_lang: bool = True
+    keep_temp_files: bool = False
+    max_workers: typing.Optional[int] = None
+    confidence: typing.Optional[int] = None
+    tesseract_width: typing.Optional[int] = None
+    tesseract_oem: typing.Optional[TesseractEngineMode] = None
+    tesseract_psm: typing.Optional[TesseractPageSegmentationMode] = None
+    tesseract_shards: typing.Optional[int] = None
+    tesseract_cli: bool = False
+    age: typing.Optional[timedelta] = None
+    srt_age: typing.Optional[timedelta] = None
+    config: Config = field(init=False, compare=False)
 
-    def __init__(self,
-                 config_path: typing.Optional[str] = None,
-                 languages: typing.Optional[typing.Set[Language]] = None,
-                 tags: typing.Optional[typing.Set[str]] = None,
-                 encoding: typing.Optional[str] = None,
-                 overwrite=False,
-                 one_per_lang=True,
-                 keep_temp_files=False,
-                 max_workers: typing.Optional[int] = None,
-                 confidence: typing.Optional[int] = None,
-                 tesseract_width: typing.Optional[int] = None,
-                 tesseract_oem: typing.Optional[TesseractEngineMode] = None,
-                 tesseract_psm: typing.Optional[TesseractPageSegmentationMode] = None,
-                 age: typing.Optional[timedelta] = None,
-                 srt_age: typing.Optional[timedelta] = None):
-        self.config = Config.from_path(config_path) if config_path else Config()
-        self.languages = languages or set()
-        self.tags = tags or {'default'}
-        self.encoding = encoding
-        self.overwrite = overwrite
-        self.one_per_lang = one_per_lang
-        self.keep_temp_files = keep_temp_files
-        self.max_workers = max_workers
-        self.confidence = confidence
-        self.tesseract_width = tesseract_width
-        self.tesseract_oem = tesseract_oem
-        self.tesseract_psm = tesseract_psm
-        self.age = age
-        self.srt_age = srt_age
+    def __post_init__(self):
+        object.__setattr__(self, 'languages', frozenset(self.languages or ()))
+        object.__setattr__(self, 'tags', frozenset(self.tags or ('default',)))
+        object.__setattr__(self, 'config', load_config(self.config_path))
 
     def __repr__(self):
         return f'<{self.__class__.__name__} [{self}]>'
@@ -80,5 +80,7 @@ class Options:
                 f'tesseract_width:{self.tesseract_width}, '
                 f'tesseract_oem:{self.tesseract_oem}, '
                 f'tesseract_psm:{self.tesseract_psm}, '
+                f'tesseract_shards:{self.tesseract_shards}, '
+                f'tesseract_cli:{self.tesseract_cli}, '
                 f'age:{self.age}, '
                 f'srt_age:{self.srt_age}')
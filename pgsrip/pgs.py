@@ -1,6 +1,8 @@
 import enum
 import logging
+import struct
 import typing
+from array import array
 
 import cv2
 
@@ -8,10 +10,13 @@ import numpy as np
 from numpy import ndarray
 
 from pgsrip.media_path import MediaPath
-from pgsrip.utils import from_hex, safe_get, to_time
+from pgsrip.utils import from_hex, to_time
 
 logger = logging.getLogger(__name__)
 
+# magic number, presentation timestamp, decoding timestamp, segment type and segment size
+SEGMENT_HEADER = struct.Struct('>2sIIBH')
+
 
 @enum.unique
 class SegmentType(enum.Enum):
@@ -46,105 +51,147 @@ class Palette(typing.NamedTuple):
 class PgsReader:
 
     @classmethod
-    def read_segments(cls, data: bytes, media_path: MediaPath):
-        count = 0
-        b = data
-        while b:
-            if b[:2] != b'PG':
-                logger.warning('%s Ignoring invalid PGS segment data: %s', media_path, b)
+    def read_segments(cls, data: typing.BinaryIO, media_path: MediaPath):
+        while True:
+            header = data.read(13)
+            if not header:
+                break
+
+            if header[:2] != b'PG':
+                logger.warning('%s Ignoring invalid PGS segment data: %s', media_path, header)
                 break
 
-            if len(b) < 13:
-                logger.warning('%s Ignoring invalid PGS segment data with less than 13 bytes: %s', media_path, b)
+            if len(header) < 13:
+                logger.warning('%s Ignoring invalid PGS segment data with less than 13 bytes: %s', media_path, header)
                 break
 
-            segment_type = SEGMENT_TYPE[SegmentType(b[10])]
-            size = 13 + from_hex(b[11:13])
-            yield segment_type(b[:size])
-            count += size
-            b = b[size:]
+            segment_class = SEGMENT_CLASSES.get(header[10])
+            if segment_class is None:
+                raise ValueError(f'{header[10]!r} is not a valid {SegmentType.__name__}')
+            yield segment_class(header + data.read(from_hex(header[11:13])))
 
     @classmethod
-    def decode(cls, data: bytes, media_path: MediaPath):
+    def decode(cls, data: typing.BinaryIO, media_path: MediaPath):
         segments: typing.List[BaseSegment] = []
         index = 0
         for s in cls.read_segments(data, media_path):
             segments.append(s)
-            if s.type == SegmentType.END:
+            if s.is_end:
                 yield DisplaySet(index, segments)
                 segments = []
                 index += 1
 
 
 class PgsImage:
+    __slots__ = ('rle_data', 'palette_lut', 'width', '_data')
 
-    def __init__(self, data: bytes, palettes: typing.List[Palette]):
+    def __init__(self, data: bytes, palette_lut: ndarray, width: typing.Optional[int] = None):
         self.rle_data = data
-        self.palettes = palettes
+        self.palette_lut = palette_lut
+        self.width = width
         self._data: typing.Optional[ndarray] = None
 
+    @property
+    def palettes(self):
+        return [Palette(*row) for row in self.palette_lut.tolist()]
+
     @property
     def data(self):
         if self._data is None:
-            self._data = self.decode_rle_image(self.rle_data, self.palettes)
+            self._data = self.decode_rle_image(self.rle_data, self.palette_lut, width=self.width)
         return self._data
 
     @classmethod
-    def decode_rle_image(cls, data: bytes, palettes: typing.List[Palette], binary=True):
-        image_array: typing.List[int] = []
-        alpha_array: typing.List[int] = []
-        dimension = 1 if binary else 3
-        cols = 1
+    def decode_batch(cls, images: typing.Iterable['PgsImage']):
+        colors_by_palettes: typing.Dict[bytes, ndarray] = {}
+        for image in images:
+            if image._data is not None:
+                continue
+
+            key = image.palette_lut.tobytes()
+            colors = colors_by_palettes.get(key)
+            if colors is None:
+                colors = colors_by_palettes[key] = cls.get_colors(image.palette_lut, binary=True)
+            image._data = cls.decode_rle_image(image.rle_data, image.palette_lut, colors=colors, width=image.width)
+
+    @classmethod
+    def decode_rle_image(cls,
+                         data: bytes,
+                         palette_lut: ndarray,
+                         binary=True,
+                         colors: typing.Optional[ndarray] = None,
+                         width: typing.Optional[int] = None):
+        if colors is None:
+            colors = cls.get_colors(palette_lut, binary)
+        lengths = array('H')
+        indexes = array('B')
+        add_length = lengths.append
+        add_index = indexes.append
+        size = len(data)
+        # a truncated code reads zeros past the end
+        data += bytes(3)
+        pixels = 0
+        # the object width is known from its ODS, otherwise it is the length of the first line
+        cols = width or 1
         i = 0
-        while i < len(data):
-            length, color, count = cls.decode_rle_position(data, i)
-            if not length and cols < 2:
-                cols = len(image_array) // dimension
-            palette = palettes[color]
-            image_color = cls.get_color(palette, binary)
-            image_array.extend(image_color * length)
-            if not binary:
-                alpha_array.extend([palette[3]] * length)
-            i += count
-
-        rows = (len(image_array) // dimension + cols - 1) // cols
-        if cols * rows * dimension != len(image_array):
-            # corrupted image
-            delta = cols * rows * dimension - len(image_array)
-            image_array.extend((cls.get_color(palettes[0], binary) * dimension) * delta)
-
-        img = np.array(image_array, dtype=np.uint8).reshape((rows, cols) if binary else (rows, cols, dimension))
+        while i < size:
+            color = data[i]
+            if color:
+                length = 1
+                i += 1
+            else:
+                second = data[i + 1]
+                if second < 64:
+                    length = second
+                    i += 2
+                elif second < 128:
+                    length = ((second - 64) << 8) + data[i + 2]
+                    i += 3
+                elif second < 192:
+                    length = second - 128
+                    color = data[i + 2]
+                    i += 3
+                else:
+                    length = ((second - 192) << 8) + data[i + 2]
+                    color = data[i + 3]
+                    i += 4
+
+                if not length and cols < 2:
+                    cols = pixels
+            add_length(length)
+            add_index(color)
+            pixels += length
+
+        rows = (pixels + cols - 1) // cols
+        run_lengths = np.frombuffer(lengths, dtype=np.uint16)
+        run_indexes = np.frombuffer(indexes, dtype=np.uint8)
+        # a corrupted image is padded with the first palette entry
+        delta = cols * rows - pixels
         if binary:
-            return img
-
-        image = cv2.cvtColor(img, cv2.COLOR_YCR_CB2BGR)
-        a_channel = np.array(alpha_array, dtype=np.uint8).reshape(rows, cols)
-        b_channel, g_channel, r_channel = cv2.split(image)
-        image = cv2.merge((b_channel, g_channel, r_channel, a_channel))
+            image_array = np.repeat(np.take(colors, run_indexes), run_lengths)
+            if delta:
+                image_array = np.concatenate((image_array, np.full(delta, colors[0], dtype=np.uint8)))
+            return image_array.reshape(rows, cols)
+
+        color_array = np.repeat(np.take(colors, run_indexes, axis=0), run_lengths, axis=0)
+        alpha_array = np.repeat(np.take(palette_lut[:, 3], run_indexes), run_lengths)
+        if delta:
+            color_array = np.concatenate((color_array, np.repeat(colors[:1], delta, axis=0)))
+            alpha_array = np.concatenate((alpha_array, np.full(delta, palette_lut[0, 3], dtype=np.uint8)))
+
+        image = np.empty((rows, cols, 4), dtype=np.uint8)
+        image[..., :3] = color_array.reshape(rows, cols, 3)
+        image[..., 3] = alpha_array.reshape(rows, cols)
         return image
 
     @classmethod
-    def get_color(cls, palette: Palette, binary: bool):
-        return ([0] if palette[0] > 127 else [255]) if binary else palette[:3]
-
-    @classmethod
-    def decode_rle_position(cls, data: bytes, i: int):
-        first = safe_get(data, i)
-        if first:
-            return 1, first, 1
-
-        second = safe_get(data, i + 1)
-        if second < 64:
-            return second, 0, 2
-
-        third = safe_get(data, i + 2)
-        if second < 128:
-            return ((second - 64) << 8) + third, 0, 3
-        elif second < 192:
-            return second - 128, third, 3
+    def get_colors(cls, palette_lut: ndarray, binary: bool) -> ndarray:
+        # one value per palette entry: the binarized luma, or the BGR color
+        if binary:
+            return np.where(palette_lut[:, 0] > 127, 0, 255).astype(np.uint8)
 
-        fourth = safe_get(data, i + 3)
-        return ((second - 192) << 8) + third, fourth, 4
+        ycrcb = np.ascontiguousarray(palette_lut[:, np.newaxis, :3])
+        return cv2.cvtColor(ycrcb, cv2.COLOR_YCR_CB2BGR).reshape(-1, 3)
 
     @property
     def shape(self):
@@ -152,30 +199,25 @@ class PgsImage:
 
 
 class BaseSegment:
+    __slots__ = ('bytes', 'presentation_ordinal', 'size', 'data')
+    type: SegmentType
+    is_end = False
 
     def __init__(self, b: bytes):
         self.bytes = b
+        _, pts, _, _, size = SEGMENT_HEADER.unpack_from(b)
+        self.presentation_ordinal = pts // 90
+        self.size = size
+        self.data = b[13:]
 
     @property
     def presentation_timestamp(self):
-        return to_time(from_hex(self.bytes[2:6]) / 90)
+        return to_time(self.presentation_ordinal)
 
     @property
     def decoding_timestamp(self):
         return to_time(from_hex(self.bytes[6:10]) / 90)
 
-    @property
-    def type(self):
-        return SegmentType(self.bytes[10])
-
-    @property
-    def size(self):
-        return from_hex(self.bytes[11:13])
-
-    @property
-    def data(self):
-        return self.bytes[13:]
-
     def to_json(self):
         attributes = {
             'type': 'type',
@@ -214,6 +256,8 @@ class BaseSegment:
 
 
 class PresentationCompositionSegment(BaseSegment):
+    __slots__ = ()
+    type = SegmentType.PCS
 
     @property
     def width(self):
@@ -264,6 +308,8 @@ class PresentationCompositionSegment(BaseSegment):
 
 
 class WindowDefinitionSegment(BaseSegment):
+    __slots__ = ()
+    type = SegmentType.WDS
 
     @property
     def num_windows(self):
@@ -301,15 +347,30 @@ class WindowDefinitionSegment(BaseSegment):
 
 
 class PaletteDefinitionSegment(BaseSegment):
+    __slots__ = ('_palette_lut',)
+    type = SegmentType.PDS
 
     def __init__(self, b: bytes):
         super().__init__(b)
-        self.palettes = [Palette(0, 0, 0, 0)] * 256
-        # Slice from byte 2 til end of segment. Divide by 5 to determine number of palette entries
-        # Iterate entries. Explode the 5 bytes into namedtuple Palette. Must be exploded
-        for entry in range(len(self.data[2:]) // 5):
-            i = 2 + entry * 5
-            self.palettes[self.data[i]] = Palette(*self.data[i + 1:i + 5])
+        self._palette_lut: typing.Optional[ndarray] = None
+
+    @property
+    def palette_lut(self):
+        if self._palette_lut is None:
+            # one (y, cr, cb, alpha) row per palette entry id, unset entries are all zeros
+            palette_lut = np.zeros((256, 4), dtype=np.uint8)
+            # Slice from byte 2 til end of segment. Divide by 5 to determine number of palette entries,
+            # which are (id, y, cr, cb, alpha) rows scattered at once by their id
+            count = len(self.data[2:]) // 5
+            if count:
+                entries = np.frombuffer(self.data, dtype=np.uint8, count=count * 5, offset=2).reshape(count, 5)
+                palette_lut[entries[:, 0]] = entries[:, 1:]
+            self._palette_lut = palette_lut
+        return self._palette_lut
+
+    @property
+    def palettes(self):
+        return [Palette(*row) for row in self.palette_lut.tolist()]
 
     @property
     def palette_id(self):
@@ -327,6 +388,8 @@ class PaletteDefinitionSegment(BaseSegment):
 
 
 class ObjectDefinitionSegment(BaseSegment):
+    __slots__ = ()
+    type = SegmentType.ODS
 
     @property
     def id(self):
@@ -356,11 +419,12 @@ class ObjectDefinitionSegment(BaseSegment):
             return from_hex(self.data[9:11])
 
     @property
-    def img_data(self):
-        if self.sequence_type == ObjectSequenceType.LAST:
-            return self.data[4:]
+    def img_data_offset(self):
+        return 4 if self.sequence_type == ObjectSequenceType.LAST else 11
 
-        return self.data[11:]
+    @property
+    def img_data(self):
+        return self.data[self.img_data_offset:]
 
     def attributes(self):
         return {
@@ -374,6 +438,9 @@ class ObjectDefinitionSegment(BaseSegment):
 
 
 class EndSegment(BaseSegment):
+    __slots__ = ()
+    type = SegmentType.END
+    is_end = True
 
     def attributes(self):
         return {}
@@ -386,48 +453,61 @@ SEGMENT_TYPE = {
     SegmentType.WDS: WindowDefinitionSegment,
     SegmentType.END: EndSegment
 }
+SEGMENT_CLASSES: typing.Dict[int, typing.Type[BaseSegment]] = {t.value: c for t, c in SEGMENT_TYPE.items()}
 
 
 class DisplaySet:
+    __slots__ = ('index', 'segments', 'segments_by_type')
 
     def __init__(self, index: int, segments: typing.List[BaseSegment]):
         self.index = index
         self.segments = segments
+        segments_by_type: typing.Dict[SegmentType, typing.List[typing.Any]] = {
+            SegmentType.PCS: [],
+            SegmentType.WDS: [],
+            SegmentType.PDS: [],
+            SegmentType.ODS: [],
+            SegmentType.END: [],
+        }
+        for s in segments:
+            segments_by_type[s.type].append(s)
+        self.segments_by_type = segments_by_type
 
     @property
-    def pcs(self):
-        return [s for s in self.segments if isinstance(s, PresentationCompositionSegment)][0]
+    def pcs(self) -> PresentationCompositionSegment:
+        return self.segments_by_type[SegmentType.PCS][0]
 
     @property
-    def wds(self):
-        return [s for s in self.segments if isinstance(s, WindowDefinitionSegment)][0]
+    def wds(self) -> WindowDefinitionSegment:
+        return self.segments_by_type[SegmentType.WDS][0]
 
     @property
-    def pds_segments(self):
-        return [s for s in self.segments if isinstance(s, PaletteDefinitionSegment)]
+    def pds_segments(self) -> typing.List[PaletteDefinitionSegment]:
+        return self.segments_by_type[SegmentType.PDS]
 
     @property
-    def ods_segments(self):
-        return [s for s in self.segments if isinstance(s, ObjectDefinitionSegment)]
+    def ods_segments(self) -> typing.List[ObjectDefinitionSegment]:
+        return self.segments_by_type[SegmentType.ODS]
 
     @property
-    def end(self):
-        return [s for s in self.segments if isinstance(s, EndSegment)][0]
+    def end(self) -> EndSegment:
+        return self.segments_by_type[SegmentType.END][0]
+
+    @property
+    def rle_data(self):
+        return b''.join(memoryview(ods.data)[ods.img_data_offset:] for ods in self.ods_segments)
 
     def is_start(self):
         return self.pcs.is_start()
 
     def is_valid(self):
         valid = True
-        counts: typing.Dict[SegmentType, int] = {}
-        for s in self.segments:
-            counts[s.type] = counts.get(s.type, 0) + 1
-            if (isinstance(s, PresentationCompositionSegment)
-                    and s.composition_state == CompositionState.ACQUISITION_POINT):
+        for s in self.segments_by_type[SegmentType.PCS]:
+            if s.composition_state == CompositionState.ACQUISITION_POINT:
                 logger.warning('ACQUISITION_POINT found %s, %r', s, self)
 
         for t in (SegmentType.PCS, SegmentType.WDS, SegmentType.END):
-            count = counts.get(t)
+            count = len(self.segments_by_type[t])
             if not count:
                 logger.warning('No %s found for %r', t, self)
                 valid = False
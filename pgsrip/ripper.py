@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 
@@ -13,22 +15,32 @@ from pysrt import SubRipFile, SubRipItem
 
 import pytesseract as tess
 
+try:
+    from tesserocr import PyTessBaseAPI
+except ImportError:
+    PyTessBaseAPI = None
+
 from pgsrip.media import Pgs, PgsSubtitleItem
 from pgsrip.options import Options, TesseractEngineMode, TesseractPageSegmentationMode
-from pgsrip.tsv import TsvData
+from pgsrip.pgs import PgsImage
+from pgsrip.tsv import TsvData, parse_tsv
+from pgsrip.utils import to_time
 
 
 logger = logging.getLogger(__name__)
 
+MIN_SHARD_SIZE = 20
+
 
 class ImageArea:
 
     def __init__(self, items: typing.List[PgsSubtitleItem], gap: typing.Tuple[int, int]):
         self.gap = gap
-        self.width = sum([(item.shape[3] - item.shape[1]) for item in items]) + (len(items) - 1) * gap[1]
+        shapes = np.array([item.shape for item in items], dtype=np.int64).reshape(-1, 4)
+        self.width = int((shapes[:, 3] - shapes[:, 1]).sum()) + (len(items) - 1) * gap[1]
         self.shape = (
-            min([item.shape[0] for item in items]), items[0].shape[1],
-            max([item.shape[2] for item in items]), min([item.shape[1] for item in items]) + self.width)
+            int(shapes[:, 0].min()), int(shapes[0, 1]),
+            int(shapes[:, 2].max()), int(shapes[:, 1].min()) + self.width)
         self.items = items
 
     def __str__(self):
@@ -41,8 +53,8 @@ class ImageArea:
     def height(self):
         return self.shape[2] - self.shape[0]
 
-    def create_area_image(self, start: typing.Tuple[int, int]):
-        area_image = np.full((self.height, self.width), 255, dtype=np.uint8)
+    def create_area_image(self, start: typing.Tuple[int, int], out: typing.Optional[np.ndarray] = None):
+        area_image = out if out is not None else np.empty((self.height, self.width), dtype=np.uint8)
 
         current_width = 0
         for item in self.items:
@@ -51,8 +63,11 @@ class ImageArea:
                 start[0] + h_start, start[1] + w_start,
                 start[0] + h_end, start[1] + w_end
             )
+            area_image[:h_start, w_start:w_end] = 255
             area_image[h_start:h_end, w_start:w_end] = item.image.data
+            area_image[h_end:, w_start:w_end] = 255
             current_width += item.width + self.gap[1]
+            area_image[:, w_end:current_width] = 255
 
         return area_image
 
@@ -69,45 +84,64 @@ class ImageArea:
 
 class FullImage:
 
-    def __init__(self, areas: typing.List[ImageArea], gap: typing.Tuple[int, int]):
+    def __init__(self,
+                 areas: typing.List[ImageArea],
+                 gap: typing.Tuple[int, int],
+                 buffer: typing.Optional[np.ndarray] = None):
         border = 100
-        total_height = sum([area.height for area in areas]) + (len(areas) - 1) * gap[0] + 2 * border
-        total_width = max([area.width for area in areas]) + 2 * border
-        full_image = np.full((total_height, total_width), 255, dtype=np.uint8)
+        total_height = sum(area.height for area in areas) + (len(areas) - 1) * gap[0] + 2 * border
+        total_width = max(area.width for area in areas) + 2 * border
+        size = total_height * total_width
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(size, dtype=np.uint8)
+        full_image = buffer[:size].reshape(total_height, total_width)
+        full_image[:border] = 255
         h_start = border
         w_start = border
         for area in areas:
             h_end = h_start + area.height
             w_end = w_start + area.width
-            full_image[h_start:h_end, w_start:w_end] = area.create_area_image((h_start, w_start))
+            full_image[h_start:h_end, :w_start] = 255
+            area.create_area_image((h_start, w_start), out=full_image[h_start:h_end, w_start:w_end])
+            full_image[h_start:h_end, w_end:] = 255
             h_start = h_end + gap[0]
+            full_image[h_end:h_start] = 255
+        full_image[h_start - gap[0]:] = 255
 
         self.data = full_image
+        self.buffer = buffer
 
     @classmethod
-    def from_items(cls, items: typing.List[PgsSubtitleItem], gap: typing.Tuple[int, int], max_width: int):
+    def from_items(cls,
+                   items: typing.List[PgsSubtitleItem],
+                   gap: typing.Tuple[int, int],
+                   max_width: int,
+                   buffer: typing.Optional[np.ndarray] = None):
         areas: typing.List[ImageArea] = []
-        remaining = list(items)
-        remaining.sort(key=lambda x: x.height)
+        sorted_items = sorted(items, key=lambda x: x.height)
+        shapes = np.array([item.shape for item in sorted_items], dtype=np.int64).reshape(-1, 4)
+        h_centers = np.array([item.h_center for item in sorted_items], dtype=np.int64)
+        widths = np.array([item.width for item in sorted_items], dtype=np.int64)
+        remaining = np.arange(len(sorted_items))
         while len(remaining) > 0:
-            first_item = remaining.pop(0)
-            area_items = [first_item] + [item for item in remaining if item.intersect(first_item)]
-            remaining = [item for item in remaining if not item.intersect(first_item)]
-            current_items: typing.List[PgsSubtitleItem] = []
-            current_width = 0
-            for area_item in area_items:
-                current_width += area_item.width + gap[1]
-                if current_width > max_width:
-                    areas.append(ImageArea(current_items, gap))
-                    current_width = area_item.width
-                    current_items = [area_item]
-                else:
-                    current_items.append(area_item)
-
-            if len(current_items) > 0:
-                areas.append(ImageArea(current_items, gap))
-
-        return FullImage(areas, gap)
+            first, others = remaining[0], remaining[1:]
+            h_center = h_centers[first]
+            intersects = (shapes[others, 0] <= h_center) & (h_center <= shapes[others, 2])
+            area_indexes = np.concatenate(([first], others[intersects]))
+            remaining = others[~intersects]
+            ends = np.cumsum(widths[area_indexes] + gap[1])
+            start = 0
+            split = int(np.searchsorted(ends, max_width, side='right'))
+            while split < len(area_indexes):
+                areas.append(ImageArea([sorted_items[i] for i in area_indexes[start:split]], gap))
+                start = split
+                # the item starting a new area is counted without its gap
+                threshold = max_width - widths[area_indexes[start]] + ends[start]
+                split = max(start + 1, int(np.searchsorted(ends, threshold, side='right')))
+
+            areas.append(ImageArea([sorted_items[i] for i in area_indexes[start:]], gap))
+
+        return FullImage(areas, gap, buffer)
 
     def __repr__(self):
         return f'<{self.__class__.__name__} [{self}]>'
@@ -122,12 +156,17 @@ class PgsToSrtRipper:
         self.pgs = pgs
         self.confidence = min(max(options.confidence or 65, 0), 100)
         self.max_tess_width = min(max(options.tesseract_width or 31 * 1024, 10 * 1024), 31 * 1024)
-        self.omp_thread_limit = options.max_workers
         self.oem = options.tesseract_oem or TesseractEngineMode.NEURAL
         self.psm = options.tesseract_psm or TesseractPageSegmentationMode.SINGLE_UNIFORM_BLOCK_OF_TEXT
+        PgsImage.decode_batch(item.image for item in self.pgs.items)
         max_height = max([item.height for item in self.pgs.items]) // 2
         self.gap = (max_height // 2 + 30, max_height // 2 + 100)
         self.keep_temp_files = options.keep_temp_files
+        self.shards = max(1, options.tesseract_shards or 1)
+        self.tesseract_cli = options.tesseract_cli
+        self.png_digests: typing.Dict[int, bytes] = {}
+        self.buffers: typing.Dict[int, np.ndarray] = {}
+        self.api = None
 
     def process(self,
                 subs: SubRipFile,
@@ -137,100 +176,135 @@ class PgsToSrtRipper:
                 max_width: int,
                 oem: TesseractEngineMode,
                 psm: TesseractPageSegmentationMode):
-        full_image = FullImage.from_items(items, self.gap, max_width)
+        shards = self.split_shards(items)
+        name = f'{os.path.basename(subs.path)}-{len(items)}'
+        if len(shards) == 1:
+            results = [self.recognize(name, 0, items, confidence, max_width, oem, psm)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                results = list(executor.map(
+                    lambda i: self.recognize(f'{name}-{i}', i, shards[i], confidence, max_width, oem, psm),
+                    range(len(shards))))
 
-        config = {
-            'output_type': tess.Output.DICT,
-            'config': f'--psm {psm.value} --oem {oem.value}'
-        }
+        remaining = []
+        for shard, data in zip(shards, results):
+            for item in shard:
+                text = self.accept(data, item, confidence)
+                if text is None:
+                    remaining.append(item)
+                    continue
+
+                text = item.text
+                if post_process:
+                    text = post_process(text)
+                if text:
+                    item = SubRipItem(0, to_time(item.start), to_time(item.end), text)
+                    subs.append(item)
 
-        if self.pgs.language:
-            config.update({'lang': self.pgs.language.alpha3})
+        return remaining
+
+    def split_shards(self, items: typing.List[PgsSubtitleItem]):
+        # a single tesserocr api can't be shared between threads
+        count = min(self.shards if self.api is None else 1, len(items) // MIN_SHARD_SIZE)
+        if count <= 1:
+            return [items]
+
+        size = -(-len(items) // count)
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def recognize(self,
+                  name: str,
+                  shard: int,
+                  items: typing.List[PgsSubtitleItem],
+                  confidence: int,
+                  max_width: int,
+                  oem: TesseractEngineMode,
+                  psm: TesseractPageSegmentationMode):
+        full_image = FullImage.from_items(items, self.gap, max_width, self.buffers.get(shard))
+        self.buffers[shard] = full_image.buffer
 
-        if self.omp_thread_limit:
-            os.environ['OMP_THREAD_LIMIT'] = str(self.omp_thread_limit)
         if self.keep_temp_files:
-            png_file = os.path.join(self.pgs.temp_folder,
-                                    f'{os.path.basename(subs.path)}-{len(items)}'
-                                    f'-psm{psm.value}-{oem.name}-{confidence}.png')
-            logger.debug('Writing temporary png file %s', png_file)
-            cv2.imwrite(png_file, full_image.data)
+            png_file = os.path.join(self.pgs.temp_folder, f'{name}-psm{psm.value}-{oem.name}-{confidence}.png')
+            digest = hashlib.blake2b(full_image.data, digest_size=8).digest()
+            if digest == self.png_digests.get(shard):
+                logger.debug('Skipping temporary png file %s: same image as the previous one', png_file)
+            else:
+                logger.debug('Writing temporary png file %s', png_file)
+                cv2.imwrite(png_file, full_image.data)
+                self.png_digests[shard] = digest
 
-        data = TsvData(tess.image_to_data(full_image.data, **config), confidence=confidence)
+        data = TsvData(self.image_to_data(full_image.data, oem, psm), confidence=confidence)
 
         if self.keep_temp_files:
-            results_file = os.path.join(self.pgs.temp_folder,
-                                        f'{os.path.basename(subs.path)}-{len(items)}-{confidence}.json')
+            results_file = os.path.join(self.pgs.temp_folder, f'{name}-{confidence}.json')
             logger.debug('Writing temporary results file %s', results_file)
             with open(results_file, mode='w', encoding='utf8') as f:
-                json.dump([i.__dict__ for i in data.items], f, indent=2, ensure_ascii=False)
+                json.dump(data.to_json(), f, indent=2, ensure_ascii=False)
 
-        remaining = []
-        for item in items:
-            text = self.accept(data, item, confidence)
-            if text is None:
-                remaining.append(item)
-                continue
-
-            text = item.text
-            if post_process:
-                text = post_process(text)
-            if text:
-                item = SubRipItem(0, item.start, item.end, text)
-                subs.append(item)
+        return data
 
-        return remaining
+    def image_to_data(self, image: np.ndarray, oem: TesseractEngineMode, psm: TesseractPageSegmentationMode):
+        if self.api is not None and oem == self.oem:
+            height, width = image.shape
+            self.api.SetPageSegMode(psm.value)
+            # the image is black and white: packed as 1 bit per pixel, where 1 is white for tesseract
+            self.api.SetImageBytes(np.packbits(image > 127, axis=1).tobytes(), width, height, 0, (width + 7) // 8)
+            return parse_tsv(self.api.GetTSVText(0))
+
+        config = {
+            'output_type': tess.Output.DICT,
+            'config': f'--psm {psm.value} --oem {oem.value}'
+        }
+
+        if self.pgs.language:
+            config.update({'lang': self.pgs.language.alpha3})
+
+        return tess.image_to_data(image, **config)
 
     @classmethod
     def accept(cls, data: TsvData, item: PgsSubtitleItem, confidence: int):
-        rows = data.select(item.place) if item.place else []
-        lines = []
-        words = []
-        last_row = None
-        for row in rows:
-            if row.conf < confidence:
-                if not data.has_word(row.text):
-                    return None
-
-            if last_row is not None and (last_row.page_num < row.page_num
-                                         or last_row.block_num < row.block_num
-                                         or last_row.par_num < row.par_num
-                                         or last_row.line_num < row.line_num) \
-                    and len(words) > 0:
-                lines.append(' '.join(words))
-                words.clear()
-            words.append(row.text)
-            last_row = row
-
-        if len(words) > 0:
-            lines.append(' '.join(words))
-            words.clear()
-
-        item.text = '\n'.join(lines).strip()
+        if not item.place:
+            item.text = ''
+            return item.text
+
+        rows = data.select(item.place)
+        if not all(data.has_word(text) for text in rows.text[rows.conf < confidence]):
+            return None
+
+        item.text = '\n'.join(rows.lines()).strip()
         return item.text
 
     def rip(self, post_process: typing.Callable[[str], str]):
         subs = SubRipFile(path=str(self.pgs.media_path.translate(extension='srt')))
         oem, psm, confidence, max_width = self.oem, self.psm, self.confidence, self.max_tess_width
         items = self.pgs.items
-        previous_size = len(items)
-        while previous_size > 0:
-            items = self.process(subs, items, post_process, confidence, max_width, oem, psm)
-            if not items:
-                break
-
-            current_size = len(items)
-            if current_size < 20:
-                max_width = min(sum([item.width + self.gap[1] for item in items]), self.max_tess_width)
-                confidence = 0
-                remaining_items = self.process(subs, items, post_process, confidence, max_width, oem, psm)
-                if remaining_items:
-                    logger.warning('Subtitles were not ripped: %r', remaining_items)
-                break
-            elif current_size > previous_size * 0.8:
-                max_width = min(sum([item.width + self.gap[1] for item in items]), self.max_tess_width) // 2
-                confidence = max(0, confidence - 5)
-            previous_size = current_size
+        if PyTessBaseAPI is not None and not self.tesseract_cli and self.pgs.language:
+            tessdata = os.getenv('TESSDATA_PREFIX')
+            self.api = PyTessBaseAPI(**({'path': tessdata} if tessdata else {}),
+                                     lang=self.pgs.language.alpha3, oem=oem.value)
+        try:
+            previous_size = len(items)
+            while previous_size > 0:
+                items = self.process(subs, items, post_process, confidence, max_width, oem, psm)
+                if not items:
+                    break
+
+                current_size = len(items)
+                if current_size < 20:
+                    max_width = min(sum([item.width + self.gap[1] for item in items]), self.max_tess_width)
+                    confidence = 0
+                    remaining_items = self.process(subs, items, post_process, confidence, max_width, oem, psm)
+                    if remaining_items:
+                        logger.warning('Subtitles were not ripped: %r', remaining_items)
+                    break
+                elif current_size > previous_size * 0.8:
+                    max_width = min(sum([item.width + self.gap[1] for item in items]), self.max_tess_width) // 2
+                    confidence = max(0, confidence - 5)
+                previous_size = current_size
+        finally:
+            if self.api is not None:
+                self.api.End()
+                self.api = None
 
         subs.clean_indexes()
 
@@ -9,13 +9,13 @@ logger = logging.getLogger(__name__)
 
 
 class Sup(Media):
+    __slots__ = ()
 
     def __init__(self, path: str):
         media_path = MediaPath(path)
         super().__init__(media_path, languages={media_path.language})
 
     def get_pgs_medias(self, options: Options) -> Iterable[Pgs]:
-        temp_folder = self.media_path.create_temp_folder()
-        pgs = Pgs(self.media_path, options=options, data_reader=self.media_path.get_data, temp_folder=temp_folder)
+        pgs = Pgs(self.media_path, options=options, data_reader=self.media_path.open_data)
         if pgs.matches(options):
             yield pgs
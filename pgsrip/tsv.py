@@ -1,5 +1,19 @@
 import typing
 
+import numpy as np
+
+INT_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height')
+COLUMNS = INT_COLUMNS + ('conf', 'text')
+LINE_COLUMNS = ('page_num', 'block_num', 'par_num', 'line_num')
+# lexsort uses the last key as the primary one
+SORT_COLUMNS = ('word_num', 'line_num', 'par_num', 'block_num', 'page_num')
+
+
+def parse_tsv(tsv: str) -> typing.Dict[str, typing.Sequence[str]]:
+    # tesseract tsv output without the header line: the text column is the last one and may be empty
+    rows = [line.split('\t', len(COLUMNS) - 1) for line in tsv.splitlines() if line]
+    return dict(zip(COLUMNS, zip(*rows))) if rows else {key: () for key in COLUMNS}
+
 
 class TsvDataItem:
 
@@ -36,23 +50,65 @@ class TsvDataItem:
         return h_start <= self.h_center <= h_end and w_start <= self.w_center <= w_end
 
 
+class TsvDataRows:
+    __slots__ = ('line_keys', 'conf', 'text')
+
+    def __init__(self, line_keys: np.ndarray, conf: np.ndarray, text: np.ndarray):
+        self.line_keys = line_keys
+        self.conf = conf
+        self.text = text
+
+    def __len__(self):
+        return len(self.text)
+
+    def lines(self) -> typing.List[str]:
+        if not len(self.text):
+            return []
+
+        # rows are sorted: a line starts wherever page, block, paragraph or line number changes
+        boundaries = np.flatnonzero(np.any(np.diff(self.line_keys, axis=0) != 0, axis=1)) + 1
+        return [' '.join(words) for words in np.split(self.text, boundaries)]
+
+
 class TsvData:
 
     def __init__(self, data: dict, confidence: int):
         self.confidence = confidence
-        keys = data.keys()
-        items = [TsvDataItem(**{k: values[i] for (i, k) in enumerate(keys)}) for values in (
-            zip(*[data[key] for key in keys]))]
-        items.sort(key=lambda x: x.word_num)
-        items.sort(key=lambda x: x.line_num)
-        items.sort(key=lambda x: x.par_num)
-        items.sort(key=lambda x: x.block_num)
-        items.sort(key=lambda x: x.page_num)
-        self.items = items
-        self.words = {item.text for item in items if item.text and item.conf >= confidence}
+        columns = {key: np.asarray(data[key], dtype=np.int64) for key in INT_COLUMNS}
+        # cast to float first to handle strings passed by pytesseract<0.3.10
+        columns['conf'] = np.asarray(data['conf'], dtype=np.float64).astype(np.int64)
+        order = np.lexsort([columns[key] for key in SORT_COLUMNS])
+        self.columns = {key: values[order] for key, values in columns.items()}
+        self.text = np.asarray(data['text'], dtype=object)[order]
+        word_indexes = np.flatnonzero(self.columns['level'] == 5)
+        self.h_center = (self.columns['top'] + self.columns['height'] // 2)[word_indexes]
+        self.w_center = (self.columns['left'] + self.columns['width'] // 2)[word_indexes]
+        self.word_line_keys = np.stack([self.columns[key][word_indexes] for key in LINE_COLUMNS], axis=1)
+        self.word_conf = self.columns['conf'][word_indexes]
+        self.word_text = self.text[word_indexes]
+        self.words = {text for text in self.text[self.columns['conf'] >= confidence] if text}
+        self._items: typing.Optional[typing.List[TsvDataItem]] = None
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = self.create_items(np.arange(len(self.text)))
+        return self._items
+
+    def create_items(self, indexes: np.ndarray):
+        columns = self.columns
+        rows = zip(*(columns[key][indexes] for key in INT_COLUMNS), columns['conf'][indexes], self.text[indexes])
+        return [TsvDataItem(*row) for row in rows]
+
+    def to_json(self):
+        values = [self.columns[key].tolist() for key in INT_COLUMNS + ('conf',)] + [self.text.tolist()]
+        return [dict(zip(COLUMNS, row)) for row in zip(*values)]
 
     def select(self, shape: typing.Tuple[int, int, int, int]):
-        return [item for item in self.items if item.level == 5 and item.matches(shape)]
+        h_start, w_start, h_end, w_end = shape
+        h_center, w_center = self.h_center, self.w_center
+        mask = (h_start <= h_center) & (h_center <= h_end) & (w_start <= w_center) & (w_center <= w_end)
+        return TsvDataRows(self.word_line_keys[mask], self.word_conf[mask], self.word_text[mask])
 
     def has_word(self, word: str):
         return word in self.words
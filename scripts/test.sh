@@ -4,3 +4,4 @@ set -ex
 
 flake8
 mypy --check-untyped-defs pgsrip
+pytest
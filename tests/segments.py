@@ -0,0 +1,63 @@
+import struct
+import typing
+
+import numpy as np
+
+
+def segment(segment_type: int, timestamp: int, payload: bytes):
+    return b'PG' + struct.pack('>IIBH', timestamp * 90, 0, segment_type, len(payload)) + payload
+
+
+def pcs(timestamp: int, start=True):
+    objects = struct.pack('>HBBHH', 0, 0, 0, 0, 0) if start else b''
+    payload = struct.pack('>HHBHBBBB', 1920, 1080, 0x10, 0, 0x80 if start else 0x00, 0, 0, 1 if start else 0)
+    return segment(0x16, timestamp, payload + objects)
+
+
+def wds(timestamp: int, x: int, y: int, width: int, height: int):
+    return segment(0x17, timestamp, struct.pack('>BBHHHH', 1, 0, x, y, width, height))
+
+
+def pds(timestamp: int, entries: typing.Iterable[typing.Tuple[int, int, int, int, int]]):
+    return segment(0x14, timestamp, bytes([0, 0]) + b''.join(bytes(entry) for entry in entries))
+
+
+def ods(timestamp: int, width: int, height: int, rle: bytes, split: typing.Optional[int] = None):
+    header = struct.pack('>HB', 0, 0)
+    size = (len(rle) + 4).to_bytes(3, 'big') + struct.pack('>HH', width, height)
+    if split is None:
+        return segment(0x15, timestamp, header + b'\xc0' + size + rle)
+
+    return (segment(0x15, timestamp, header + b'\x80' + size + rle[:split]) +
+            segment(0x15, timestamp, header + b'\x40' + rle[split:]))
+
+
+def end(timestamp: int):
+    return segment(0x80, timestamp, b'')
+
+
+def display_set(timestamp: int,
+                x: int,
+                y: int,
+                width: int,
+                height: int,
+                rle: bytes,
+                palette: typing.Iterable[typing.Tuple[int, int, int, int, int]],
+                split: typing.Optional[int] = None):
+    return (pcs(timestamp) + wds(timestamp, x, y, width, height) + pds(timestamp, palette) +
+            ods(timestamp, width, height, rle, split=split) + end(timestamp))
+
+
+def clear_set(timestamp: int, x: int, y: int, width: int, height: int):
+    return pcs(timestamp, start=False) + wds(timestamp, x, y, width, height) + end(timestamp)
+
+
+def solid_rle(width: int, height: int, color=1):
+    return (bytes([0, 0xc0 | (width >> 8), width & 0xff, color]) + b'\x00\x00') * height
+
+
+def palette_lut(entries: typing.Iterable[typing.Tuple[int, int, int, int, int]]):
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    for entry_id, *values in entries:
+        lut[entry_id] = values
+    return lut
@@ -0,0 +1,44 @@
+import io
+from types import SimpleNamespace
+
+from pgsrip.media import PgsSubtitleItem
+from pgsrip.media_path import MediaPath
+from pgsrip.pgs import PgsReader
+
+from tests.segments import clear_set, display_set, solid_rle
+
+PALETTE = ((1, 235, 128, 128, 255),)
+
+
+def test_fix_end_timestamps():
+    items = [SimpleNamespace(start=start, end=end) for start, end in (
+        (1000, 2500),
+        (3000, 3000),
+        (5000, None),
+        (5001, 0),
+        (20000, None),
+    )]
+
+    valid = PgsSubtitleItem.fix_end_timestamps(items)
+
+    assert valid.tolist() == [True, True, True, False, False]
+    assert [item.end for item in items] == [2500, 4999, 5001, 0, None]
+
+
+def test_fix_end_timestamps_without_items():
+    assert PgsSubtitleItem.fix_end_timestamps([]).tolist() == []
+
+
+def test_create_items():
+    rle = solid_rle(20, 10)
+    data = (display_set(1000, 100, 900, 20, 10, rle, PALETTE) + clear_set(2500, 100, 900, 20, 10) +
+            display_set(3000, 120, 880, 20, 10, rle, PALETTE) +
+            display_set(4000, 140, 860, 20, 10, rle, PALETTE) +
+            display_set(20000, 160, 840, 20, 10, rle, PALETTE))
+    media_path = MediaPath('movie.en.sup')
+
+    items = PgsSubtitleItem.create_items(media_path, PgsReader.decode(io.BytesIO(data), media_path))
+
+    assert [(item.index, item.start, item.end) for item in items] == [(0, 1000, 2500), (1, 3000, 3999)]
+    assert [item.shape for item in items] == [(900, 100, 910, 120), (880, 120, 890, 140)]
+    assert [item.h_center for item in items] == [905, 885]
@@ -0,0 +1,108 @@
+import io
+
+import numpy as np
+
+import pytest
+
+from pgsrip.media import PgsSubtitleItem
+from pgsrip.media_path import MediaPath
+from pgsrip.pgs import ObjectSequenceType, PgsImage, PgsReader, SegmentType
+
+from tests.segments import clear_set, display_set, end, palette_lut, pcs, solid_rle
+
+PALETTE = ((1, 235, 128, 128, 255), (2, 200, 128, 128, 128))
+# one run of each code: single pixel, short color 0, short color, long color 0 and long color, by line
+RLE = bytes.fromhex('01 0003 008202 0000'
+                    '004006 0000'
+                    '00c00601 0000')
+IMAGE = [
+    [0, 255, 255, 255, 0, 0],
+    [255, 255, 255, 255, 255, 255],
+    [0, 0, 0, 0, 0, 0],
+]
+
+
+def test_decode_rle_image():
+    image = PgsImage.decode_rle_image(RLE, palette_lut(PALETTE))
+
+    assert image.dtype == np.uint8
+    np.testing.assert_array_equal(image, IMAGE)
+
+
+def test_decode_rle_image_with_width():
+    image = PgsImage.decode_rle_image(bytes.fromhex('00412c 00c12c01'), palette_lut(PALETTE), width=200)
+
+    assert image.shape == (3, 200)
+    np.testing.assert_array_equal(image[0], 255)
+    np.testing.assert_array_equal(image[1, :100], 255)
+    np.testing.assert_array_equal(image[1, 100:], 0)
+    np.testing.assert_array_equal(image[2], 0)
+
+
+@pytest.mark.parametrize('rle, expected', [
+    (RLE[:8] + bytes.fromhex('0101 00'), [[0, 255, 255, 255, 0, 0], [0, 0, 255, 255, 255, 255]]),
+    (RLE[:8] + bytes.fromhex('01 0082'), [[0, 255, 255, 255, 0, 0], [0, 255, 255, 255, 255, 255]]),
+    (RLE[:8] + bytes.fromhex('00c0'), [[0, 255, 255, 255, 0, 0]]),
+], ids=['length', 'color', 'empty'])
+def test_decode_rle_image_truncated(rle, expected):
+    image = PgsImage.decode_rle_image(rle, palette_lut(PALETTE))
+
+    np.testing.assert_array_equal(image, expected)
+
+
+def test_decode_rle_image_colors():
+    image = PgsImage.decode_rle_image(RLE, palette_lut(PALETTE), binary=False)
+
+    assert image.shape == (3, 6, 4)
+    np.testing.assert_array_equal(image[0, 0], [235, 235, 235, 255])
+    np.testing.assert_array_equal(image[0, 4], [200, 200, 200, 128])
+    np.testing.assert_array_equal(image[..., 3], [
+        [255, 0, 0, 0, 128, 128],
+        [0, 0, 0, 0, 0, 0],
+        [255, 255, 255, 255, 255, 255],
+    ])
+
+
+def test_decode_batch():
+    lut = palette_lut(PALETTE)
+    images = [PgsImage(RLE, lut), PgsImage(solid_rle(4, 2, color=2), lut.copy()), PgsImage(RLE, lut, width=6)]
+
+    PgsImage.decode_batch(images)
+
+    np.testing.assert_array_equal(images[0].data, IMAGE)
+    np.testing.assert_array_equal(images[1].data, np.zeros((2, 4)))
+    np.testing.assert_array_equal(images[2].data, IMAGE)
+
+
+def test_decode_split_object():
+    rle = solid_rle(6, 2) + RLE
+    data = display_set(1000, 10, 20, 6, 5, rle, PALETTE, split=5) + clear_set(2000, 10, 20, 6, 5)
+
+    display_sets = list(PgsReader.decode(io.BytesIO(data), MediaPath('movie.en.sup')))
+
+    assert len(display_sets) == 2
+    assert [ods.sequence_type for ods in display_sets[0].ods_segments] == [
+        ObjectSequenceType.FIRST, ObjectSequenceType.LAST]
+    assert display_sets[0].ods_segments[0].width == 6
+    assert display_sets[0].rle_data == rle
+    assert display_sets[1].ods_segments == []
+
+    image = PgsSubtitleItem.generate_image(display_sets)
+    np.testing.assert_array_equal(image.data, [[0] * 6, [0] * 6] + IMAGE)
+
+
+def test_read_segments_stops_on_invalid_data():
+    data = pcs(1000) + end(1000) + b'XX' + bytes(20)
+
+    segments = list(PgsReader.read_segments(io.BytesIO(data), MediaPath('movie.en.sup')))
+
+    assert [s.type for s in segments] == [SegmentType.PCS, SegmentType.END]
+    assert segments[0].presentation_ordinal == 1000
+
+
+def test_read_segments_stops_on_truncated_header():
+    data = pcs(1000) + end(1000)[:10]
+
+    segments = list(PgsReader.read_segments(io.BytesIO(data), MediaPath('movie.en.sup')))
+
+    assert [s.type for s in segments] == [SegmentType.PCS]
@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+
+import pytest
+
+from pgsrip.media import PgsSubtitleItem
+from pgsrip.media_path import MediaPath
+from pgsrip.pgs import PgsReader
+from pgsrip.ripper import FullImage
+
+from tests.segments import clear_set, display_set, solid_rle
+
+GAP = (50, 120)
+
+
+@pytest.fixture
+def items():
+    data = b''
+    for i, (x, y, width, height) in enumerate(((100, 900, 300, 40),
+                                               (800, 905, 200, 40),
+                                               (200, 600, 500, 60),
+                                               (50, 980, 100, 30),
+                                               (400, 895, 150, 50))):
+        data += display_set(1000 + i * 2000, x, y, width, height, solid_rle(width, height), ((1, 235, 128, 128, 255),))
+        data += clear_set(2000 + i * 2000, x, y, width, height)
+    media_path = MediaPath('movie.en.sup')
+
+    return PgsSubtitleItem.create_items(media_path, PgsReader.decode(io.BytesIO(data), media_path))
+
+
+@pytest.mark.parametrize('max_width, shape, places', [
+    (31 * 1024, (440, 1090), [
+        (185, 100, 225, 400), (190, 520, 230, 720), (280, 100, 340, 600), (100, 100, 130, 200), (180, 840, 230, 990),
+    ]),
+    (900, (535, 820), [
+        (180, 100, 220, 400), (185, 520, 225, 720), (375, 100, 435, 600), (100, 100, 130, 200), (275, 100, 325, 250),
+    ]),
+    (700, (530, 700), [
+        (180, 100, 220, 400), (280, 100, 320, 300), (370, 100, 430, 600), (100, 100, 130, 200), (270, 420, 320, 570),
+    ]),
+])
+def test_full_image_from_items(items, max_width, shape, places):
+    full_image = FullImage.from_items(items, GAP, max_width)
+
+    assert full_image.data.shape == shape
+    assert [item.place for item in items] == places
+    for h_start, w_start, h_end, w_end in places:
+        np.testing.assert_array_equal(full_image.data[h_start:h_end, w_start:w_end], 0)
+    assert (full_image.data == 0).sum() == sum(item.height * item.width for item in items)
+
+
+def test_full_image_reuses_buffer(items):
+    first = FullImage.from_items(items, GAP, 31 * 1024)
+    expected = FullImage.from_items(items, GAP, 700).data.copy()
+
+    full_image = FullImage.from_items(items, GAP, 700, first.buffer)
+
+    assert full_image.buffer is first.buffer
+    np.testing.assert_array_equal(full_image.data, expected)
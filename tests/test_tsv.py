@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pgsrip.ripper import PgsToSrtRipper
+from pgsrip.tsv import COLUMNS, TsvData, parse_tsv
+
+# rows are not in reading order, and the second line comes first
+TSV = '\n'.join('\t'.join(row) for row in (
+    ('1', '1', '0', '0', '0', '0', '0', '0', '1000', '200', '-1', ''),
+    ('5', '1', '1', '1', '2', '2', '70', '50', '50', '20', '30', 'Hello'),
+    ('5', '1', '1', '1', '2', '1', '10', '50', '50', '20', '40.5', 'again'),
+    ('4', '1', '1', '1', '1', '0', '10', '10', '110', '20', '-1', ''),
+    ('5', '1', '1', '1', '1', '2', '70', '10', '50', '20', '91', 'world'),
+    ('5', '1', '1', '1', '1', '1', '10', '10', '50', '20', '96.5', 'Hello'),
+    ('5', '1', '2', '1', '1', '1', '500', '10', '50', '20', '95', 'other'),
+)) + '\n'
+
+
+def test_parse_tsv():
+    data = parse_tsv(TSV)
+
+    assert set(data) == set(COLUMNS)
+    assert data['text'] == ('', 'Hello', 'again', '', 'world', 'Hello', 'other')
+    assert data['conf'][2] == '40.5'
+
+
+def test_parse_tsv_without_rows():
+    assert parse_tsv('') == {key: () for key in COLUMNS}
+
+
+def test_select():
+    data = TsvData(parse_tsv(TSV), confidence=60)
+
+    rows = data.select((0, 0, 100, 200))
+
+    assert len(rows) == 4
+    assert rows.lines() == ['Hello world', 'again Hello']
+    assert rows.conf.tolist() == [96, 91, 40, 30]
+
+
+def test_select_outside_words():
+    data = TsvData(parse_tsv(TSV), confidence=60)
+
+    rows = data.select((100, 0, 200, 1000))
+
+    assert len(rows) == 0
+    assert rows.lines() == []
+
+
+def test_words_and_items():
+    data = TsvData(parse_tsv(TSV), confidence=60)
+
+    assert data.has_word('Hello')
+    assert data.has_word('other')
+    assert not data.has_word('again')
+    assert [(item.level, item.line_num, item.word_num, item.conf, item.text) for item in data.items] == [
+        (1, 0, 0, -1, ''),
+        (4, 1, 0, -1, ''),
+        (5, 1, 1, 96, 'Hello'),
+        (5, 1, 2, 91, 'world'),
+        (5, 2, 1, 40, 'again'),
+        (5, 2, 2, 30, 'Hello'),
+        (5, 1, 1, 95, 'other'),
+    ]
+    assert data.to_json()[2] == {
+        'level': 5, 'page_num': 1, 'block_num': 1, 'par_num': 1, 'line_num': 1, 'word_num': 1,
+        'left': 10, 'top': 10, 'width': 50, 'height': 20, 'conf': 96, 'text': 'Hello',
+    }
+
+
+@pytest.mark.parametrize('place, expected', [
+    (None, ''),
+    ((0, 0, 35, 200), 'Hello world'),
+    ((45, 60, 75, 130), 'Hello'),
+    ((0, 480, 40, 560), 'other'),
+    ((0, 0, 100, 200), None),
+    ((45, 0, 75, 60), None),
+])
+def test_accept(place, expected):
+    data = TsvData(parse_tsv(TSV), confidence=60)
+    item = SimpleNamespace(place=place, text=None)
+
+    assert PgsToSrtRipper.accept(data, item, 60) == expected
+    if expected is not None:
+        assert item.text == expected